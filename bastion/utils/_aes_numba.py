@@ -0,0 +1,147 @@
+"""
+Numba-compiled AES-256-CBC for the token generator.
+
+Optional backend used by generate_token.py when USE_NUMBA_AES is set and
+numba is installed. Produces the same ciphertext as the cryptography path.
+"""
+
+import numpy as np
+from numba import njit
+
+SBOX = np.array([
+    0x63, 0x7c, 0x77, 0x7b, 0xf2, 0x6b, 0x6f, 0xc5, 0x30, 0x01, 0x67, 0x2b, 0xfe, 0xd7, 0xab, 0x76,
+    0xca, 0x82, 0xc9, 0x7d, 0xfa, 0x59, 0x47, 0xf0, 0xad, 0xd4, 0xa2, 0xaf, 0x9c, 0xa4, 0x72, 0xc0,
+    0xb7, 0xfd, 0x93, 0x26, 0x36, 0x3f, 0xf7, 0xcc, 0x34, 0xa5, 0xe5, 0xf1, 0x71, 0xd8, 0x31, 0x15,
+    0x04, 0xc7, 0x23, 0xc3, 0x18, 0x96, 0x05, 0x9a, 0x07, 0x12, 0x80, 0xe2, 0xeb, 0x27, 0xb2, 0x75,
+    0x09, 0x83, 0x2c, 0x1a, 0x1b, 0x6e, 0x5a, 0xa0, 0x52, 0x3b, 0xd6, 0xb3, 0x29, 0xe3, 0x2f, 0x84,
+    0x53, 0xd1, 0x00, 0xed, 0x20, 0xfc, 0xb1, 0x5b, 0x6a, 0xcb, 0xbe, 0x39, 0x4a, 0x4c, 0x58, 0xcf,
+    0xd0, 0xef, 0xaa, 0xfb, 0x43, 0x4d, 0x33, 0x85, 0x45, 0xf9, 0x02, 0x7f, 0x50, 0x3c, 0x9f, 0xa8,
+    0x51, 0xa3, 0x40, 0x8f, 0x92, 0x9d, 0x38, 0xf5, 0xbc, 0xb6, 0xda, 0x21, 0x10, 0xff, 0xf3, 0xd2,
+    0xcd, 0x0c, 0x13, 0xec, 0x5f, 0x97, 0x44, 0x17, 0xc4, 0xa7, 0x7e, 0x3d, 0x64, 0x5d, 0x19, 0x73,
+    0x60, 0x81, 0x4f, 0xdc, 0x22, 0x2a, 0x90, 0x88, 0x46, 0xee, 0xb8, 0x14, 0xde, 0x5e, 0x0b, 0xdb,
+    0xe0, 0x32, 0x3a, 0x0a, 0x49, 0x06, 0x24, 0x5c, 0xc2, 0xd3, 0xac, 0x62, 0x91, 0x95, 0xe4, 0x79,
+    0xe7, 0xc8, 0x37, 0x6d, 0x8d, 0xd5, 0x4e, 0xa9, 0x6c, 0x56, 0xf4, 0xea, 0x65, 0x7a, 0xae, 0x08,
+    0xba, 0x78, 0x25, 0x2e, 0x1c, 0xa6, 0xb4, 0xc6, 0xe8, 0xdd, 0x74, 0x1f, 0x4b, 0xbd, 0x8b, 0x8a,
+    0x70, 0x3e, 0xb5, 0x66, 0x48, 0x03, 0xf6, 0x0e, 0x61, 0x35, 0x57, 0xb9, 0x86, 0xc1, 0x1d, 0x9e,
+    0xe1, 0xf8, 0x98, 0x11, 0x69, 0xd9, 0x8e, 0x94, 0x9b, 0x1e, 0x87, 0xe9, 0xce, 0x55, 0x28, 0xdf,
+    0x8c, 0xa1, 0x89, 0x0d, 0xbf, 0xe6, 0x42, 0x68, 0x41, 0x99, 0x2d, 0x0f, 0xb0, 0x54, 0xbb, 0x16,
+], dtype=np.uint8)
+
+RCON = (0x01, 0x02, 0x04, 0x08, 0x10, 0x20, 0x40)
+
+ROUNDS = 14
+
+
+def expand_key(key: bytes) -> np.ndarray:
+    """
+    Expand a 32-byte AES-256 key into its round-key table.
+
+    Returns:
+        uint32 array of shape (15, 4), one big-endian word per state column
+    """
+    if len(key) != 32:
+        raise ValueError("AES-256 key must be exactly 32 bytes")
+
+    words = [int.from_bytes(key[i:i + 4], 'big') for i in range(0, 32, 4)]
+    for i in range(8, 4 * (ROUNDS + 1)):
+        t = words[i - 1]
+        if i % 8 == 0:
+            t = ((t << 8) | (t >> 24)) & 0xffffffff
+            t = _sub_word(t) ^ (RCON[i // 8 - 1] << 24)
+        elif i % 8 == 4:
+            t = _sub_word(t)
+        words.append(words[i - 8] ^ t)
+
+    return np.array(words, dtype=np.uint32).reshape(ROUNDS + 1, 4)
+
+
+def _sub_word(w: int) -> int:
+    return ((int(SBOX[(w >> 24) & 0xff]) << 24) | (int(SBOX[(w >> 16) & 0xff]) << 16)
+            | (int(SBOX[(w >> 8) & 0xff]) << 8) | int(SBOX[w & 0xff]))
+
+
+@njit(cache=True)
+def pkcs7_pad(buf, out):
+    """Copy buf into out followed by PKCS#7 padding; returns the padded length."""
+    n = buf.shape[0]
+    pad = 16 - (n & 15)
+    out[:n] = buf
+    for i in range(n, n + pad):
+        out[i] = pad
+    return n + pad
+
+
+@njit(cache=True)
+def _xtime(b):
+    return ((b << 1) ^ (0x1b if b & 0x80 else 0)) & 0xff
+
+
+@njit(cache=True)
+def _add_round_key(s, rk, r):
+    for c in range(4):
+        w = rk[r, c]
+        s[4 * c] ^= (w >> 24) & 0xff
+        s[4 * c + 1] ^= (w >> 16) & 0xff
+        s[4 * c + 2] ^= (w >> 8) & 0xff
+        s[4 * c + 3] ^= w & 0xff
+
+
+@njit(cache=True)
+def _sub_shift(s, t):
+    # SubBytes and ShiftRows in one pass; row i rotates left by i columns
+    for c in range(4):
+        for i in range(4):
+            t[4 * c + i] = SBOX[s[4 * ((c + i) & 3) + i]]
+    s[:] = t
+
+
+@njit(cache=True)
+def _mix_columns(s):
+    for c in range(4):
+        a0 = np.int64(s[4 * c])
+        a1 = np.int64(s[4 * c + 1])
+        a2 = np.int64(s[4 * c + 2])
+        a3 = np.int64(s[4 * c + 3])
+        x = a0 ^ a1 ^ a2 ^ a3
+        s[4 * c] = a0 ^ x ^ _xtime(a0 ^ a1)
+        s[4 * c + 1] = a1 ^ x ^ _xtime(a1 ^ a2)
+        s[4 * c + 2] = a2 ^ x ^ _xtime(a2 ^ a3)
+        s[4 * c + 3] = a3 ^ x ^ _xtime(a3 ^ a0)
+
+
+@njit(cache=True)
+def aes_cbc_encrypt(pt, rk, iv, out):
+    """
+    Encrypt padded plaintext with AES-256-CBC.
+
+    Args:
+        pt: uint8 plaintext, a multiple of 16 bytes long
+        rk: round-key table from expand_key()
+        iv: 16-byte uint8 initialization vector
+        out: uint8 buffer at least as long as pt
+    """
+    s = np.empty(16, dtype=np.uint8)
+    t = np.empty(16, dtype=np.uint8)
+    prev = iv.copy()
+    for off in range(0, pt.shape[0], 16):
+        for i in range(16):
+            s[i] = pt[off + i] ^ prev[i]
+        _add_round_key(s, rk, 0)
+        for r in range(1, ROUNDS):
+            _sub_shift(s, t)
+            _mix_columns(s)
+            _add_round_key(s, rk, r)
+        _sub_shift(s, t)
+        _add_round_key(s, rk, ROUNDS)
+        out[off:off + 16] = s
+        prev[:] = s
+
+
+def encrypt(plaintext: bytes, rk: np.ndarray, iv: bytes) -> bytes:
+    """PKCS#7-pad and encrypt plaintext, returning the ciphertext."""
+    buf = np.frombuffer(plaintext, dtype=np.uint8)
+    padded = np.empty(len(plaintext) + 16, dtype=np.uint8)
+    n = pkcs7_pad(buf, padded)
+    out = np.empty(n, dtype=np.uint8)
+    aes_cbc_encrypt(padded[:n], rk, np.frombuffer(iv, dtype=np.uint8), out)
+    return out.tobytes()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# generate_token.py is a script, not a package; import it from its directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
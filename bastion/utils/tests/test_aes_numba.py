@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+np = pytest.importorskip('numpy')
+pytest.importorskip('numba')
+import _aes_numba as aes_numba  # noqa: E402
+
+# FIPS-197 Appendix C.3, AES-256
+FIPS_KEY = bytes(range(32))
+FIPS_PLAINTEXT = bytes.fromhex('00112233445566778899aabbccddeeff')
+FIPS_CIPHERTEXT = bytes.fromhex('8ea2b7ca516745bfeafc49904b496089')
+
+KEY = b'MySuperSecretKeyForParamsToken12'
+
+
+def test_fips_197_known_answer():
+    rk = aes_numba.expand_key(FIPS_KEY)
+    out = np.empty(16, dtype=np.uint8)
+    # One CBC block with an all-zero IV is a single AES block encryption
+    aes_numba.aes_cbc_encrypt(np.frombuffer(FIPS_PLAINTEXT, dtype=np.uint8), rk,
+                              np.zeros(16, dtype=np.uint8), out)
+    assert out.tobytes() == FIPS_CIPHERTEXT
+
+
+@pytest.mark.parametrize('length', [0, 1, 15, 16, 17, 255, 1000])
+def test_cbc_matches_cryptography(length):
+    pytest.importorskip('cryptography')
+    from cryptography.hazmat.primitives import padding
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+    plaintext = os.urandom(length)
+    iv = os.urandom(16)
+
+    padder = padding.PKCS7(128).padder()
+    encryptor = Cipher(algorithms.AES(KEY), modes.CBC(iv)).encryptor()
+    expected = encryptor.update(padder.update(plaintext) + padder.finalize()) + encryptor.finalize()
+
+    assert aes_numba.encrypt(plaintext, aes_numba.expand_key(KEY), iv) == expected
+
+
+def test_expand_key_rejects_short_keys():
+    with pytest.raises(ValueError):
+        aes_numba.expand_key(KEY[:16])
@@ -0,0 +1,71 @@
+import pytest
+
+from generate_token import _CLI_DEFAULTS, parse_args
+
+
+def parse_error(argv, capsys):
+    with pytest.raises(SystemExit) as exc:
+        parse_args(argv)
+    assert exc.value.code == 2
+    return capsys.readouterr().err
+
+
+def test_defaults():
+    assert parse_args([]) == _CLI_DEFAULTS
+
+
+def test_options_and_switches():
+    args = parse_args(['--protocol', 'rdp', '--host', 'h', '--width=800',
+                       '--join', 'abc', '--read-only'])
+    assert args['protocol'] == 'rdp'
+    assert args['host'] == 'h'
+    assert args['width'] == 800
+    assert args['join'] == 'abc'
+    assert args['read_only'] is True
+
+
+def test_unambiguous_prefixes():
+    args = parse_args(['--ho', 'h', '--pass', 'secret', '--output'])
+    assert args['host'] == 'h'
+    assert args['password'] == 'secret'
+    assert args['output_url'] is True
+
+
+def test_ambiguous_prefix(capsys):
+    assert 'ambiguous option: --p' in parse_error(['--p', 'x'], capsys)
+
+
+def test_missing_value_does_not_consume_next_flag(capsys):
+    err = parse_error(['--protocol', 'vnc', '--host', 'h', '--password', '--join'], capsys)
+    assert 'argument --password: expected one argument' in err
+
+
+def test_missing_value_at_end(capsys):
+    assert 'argument --host: expected one argument' in parse_error(['--host'], capsys)
+
+
+def test_flag_like_value_with_equals():
+    assert parse_args(['--password=--join'])['password'] == '--join'
+
+
+def test_help_as_option_value_is_not_help():
+    assert parse_args(['--password', '-h'])['password'] == '-h'
+
+
+@pytest.mark.parametrize('flag', ['-h', '--help', '--hel'])
+def test_help(flag, capsys):
+    with pytest.raises(SystemExit) as exc:
+        parse_args(['--host', 'h', flag])
+    assert exc.value.code == 0
+    assert 'usage:' in capsys.readouterr().out
+
+
+@pytest.mark.parametrize('argv, message', [
+    (['--bogus'], 'unrecognized arguments: --bogus'),
+    (['-x'], 'unrecognized arguments: -x'),
+    (['--port', 'abc'], "argument --port: invalid int value: 'abc'"),
+    (['--protocol', 'xyz'], "argument --protocol: invalid choice: 'xyz'"),
+    (['--read-only=yes'], "argument --read-only: ignored explicit argument 'yes'"),
+])
+def test_errors(argv, message, capsys):
+    assert message in parse_error(argv, capsys)
@@ -0,0 +1,127 @@
+import base64
+import json
+
+import pytest
+
+import generate_token
+from generate_token import TokenGenerator, _env_flag
+
+KEY = 'MySuperSecretKeyForParamsToken12'
+
+CONFIG = {
+    'connection': {
+        'type': 'rdp',
+        'settings': {'hostname': '10.0.0.12', 'username': 'Administrator', 'password': 'pässwörd'},
+    },
+}
+
+pytest.importorskip('cryptography')
+from cryptography.exceptions import InvalidTag  # noqa: E402
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes  # noqa: E402
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM  # noqa: E402
+
+
+def decode_envelope(token):
+    raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+    if raw[:1] == b'{':
+        envelope = json.loads(raw)
+        return {k: base64.urlsafe_b64decode(v) for k, v in envelope.items()}
+    msgpack = pytest.importorskip('msgpack')
+    return msgpack.unpackb(raw)
+
+
+def decrypt(token, key=KEY):
+    envelope = decode_envelope(token)
+    decryptor = Cipher(algorithms.AES(key.encode()), modes.CBC(envelope['iv'])).decryptor()
+    padded = decryptor.update(envelope['value']) + decryptor.finalize()
+    return json.loads(padded[:-padded[-1]])
+
+
+@pytest.fixture
+def generator():
+    return TokenGenerator(KEY)
+
+
+@pytest.mark.parametrize('format', ['json', 'msgpack'])
+def test_round_trip(generator, format):
+    if format == 'msgpack':
+        pytest.importorskip('msgpack')
+    assert decrypt(generator.encrypt_token(CONFIG, format=format)) == CONFIG
+
+
+def test_msgpack_envelope_holds_raw_bytes(generator):
+    msgpack = pytest.importorskip('msgpack')
+    token = generator.encrypt_token({'a': 1}, format='msgpack')
+    envelope = msgpack.unpackb(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    assert sorted(envelope) == ['iv', 'value']
+    assert len(envelope['iv']) == 16
+    assert isinstance(envelope['value'], bytes)
+
+
+def test_pycryptodome_round_trip(generator, monkeypatch):
+    aes = pytest.importorskip('Cryptodome.Cipher.AES')
+    monkeypatch.setattr(generate_token, '_PCD_AES', aes)
+    for length in (0, 15, 16, 100):
+        config = {'pad': 'x' * length}
+        assert decrypt(generator.encrypt_token(config)) == config
+
+
+def test_gcm_round_trip(generator):
+    envelope = decode_envelope(generator.encrypt_token_gcm(CONFIG))
+    assert sorted(envelope) == ['iv', 'tag', 'value']
+    assert len(envelope['iv']) == 12
+    assert len(envelope['tag']) == 16
+
+    plaintext = AESGCM(KEY.encode()).decrypt(envelope['iv'], envelope['value'] + envelope['tag'], None)
+    assert json.loads(plaintext) == CONFIG
+
+
+def test_gcm_rejects_tampered_tag(generator):
+    envelope = decode_envelope(generator.encrypt_token_gcm(CONFIG))
+    tag = bytearray(envelope['tag'])
+    tag[0] ^= 1
+    with pytest.raises(InvalidTag):
+        AESGCM(KEY.encode()).decrypt(envelope['iv'], envelope['value'] + bytes(tag), None)
+
+
+def test_unknown_format(generator):
+    with pytest.raises(ValueError):
+        generator.encrypt_token({'a': 1}, format='xml')
+
+
+@pytest.mark.parametrize('value, enabled', [
+    ('1', True), ('true', True), ('Yes', True), (' on ', True),
+    ('0', False), ('false', False), ('no', False), ('off', False), ('', False),
+])
+def test_env_flag(monkeypatch, value, enabled):
+    monkeypatch.setenv('USE_NUMBA_AES', value)
+    assert _env_flag('USE_NUMBA_AES') is enabled
+
+
+def test_env_flag_unset(monkeypatch):
+    monkeypatch.delenv('USE_NUMBA_AES', raising=False)
+    assert _env_flag('USE_NUMBA_AES') is False
+
+
+def test_encrypt_many_small_batch_stays_in_process(generator, monkeypatch):
+    import concurrent.futures
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError('small batches must not start a process pool')
+
+    monkeypatch.setattr(concurrent.futures, 'ProcessPoolExecutor', no_pool)
+    configs = [{'n': i} for i in range(10)]
+    assert [decrypt(t) for t in generator.encrypt_many(configs, workers=4)] == configs
+
+
+@pytest.mark.parametrize('format', ['json', 'msgpack'])
+def test_encrypt_many_in_workers(generator, monkeypatch, format):
+    if format == 'msgpack':
+        pytest.importorskip('msgpack')
+    monkeypatch.setattr(generate_token, '_MIN_PARALLEL_BATCH', 10)
+    configs = [{'n': i} for i in range(100)]
+    tokens = generator.encrypt_many(configs, workers=2, format=format)
+    assert [decrypt(t) for t in tokens] == configs
+    # Workers must honour the requested envelope format
+    first = base64.urlsafe_b64decode(tokens[0] + '=' * (-len(tokens[0]) % 4))[:1]
+    assert (first == b'{') == (format == 'json')
@@ -0,0 +1,56 @@
+import datetime
+import json
+import math
+
+import pytest
+
+import generate_token
+from generate_token import _json_dumps
+
+SAMPLES = [
+    {'connection': {'type': 'rdp', 'settings': {
+        'hostname': '10.0.0.12', 'username': 'Administrator', 'password': 'pAsSwOrD',
+        'width': 1920, 'height': 1080, 'dpi': 96, 'ignore-cert': True,
+        'recording-path': '${HISTORY_UUID}', 'recording-name': 'session'}}},
+    {'connection': {'type': 'ssh', 'settings': {
+        'hostname': '10.0.0.13', 'username': 'ubuntu', 'port': 22,
+        'private-key': '-----BEGIN KEY-----\nabc\n', 'sftp-root-directory': '/home/ubuntu'}}},
+    {'connection': {'join': '$abc', 'settings': {'read-only': False}}},
+    {'connection': {'settings': {'password': 'pässwörd'}}},
+    {'connection': {'settings': {'expiration': None, 'port': 2 ** 70}}},
+    {1: 'a', 2.5: 'b', True: 'c', None: 'd'},
+    {'nan': float('nan'), 'inf': float('inf')},
+    [1.5, -0.0, 12345678901234567890],
+]
+
+
+@pytest.fixture(params=['orjson', 'json'])
+def backend(request, monkeypatch):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(generate_token, 'orjson', None)
+    return request.param
+
+
+@pytest.mark.parametrize('obj', SAMPLES)
+def test_matches_json_dumps(backend, obj):
+    assert _json_dumps(obj) == json.dumps(obj, separators=(',', ':')).encode('ascii')
+
+
+def test_output_is_ascii(backend):
+    assert _json_dumps({'password': 'pässwörd'}) == b'{"password":"p\\u00e4ssw\\u00f6rd"}'
+
+
+def test_nan_is_not_null(backend):
+    assert _json_dumps([math.nan]) == b'[NaN]'
+
+
+def test_floats_round_trip(backend):
+    values = [1e16, 1e-7, 0.1, 1.5e300]
+    assert json.loads(_json_dumps(values)) == values
+
+
+def test_unsupported_types_raise(backend):
+    with pytest.raises(TypeError):
+        _json_dumps({'at': datetime.datetime(2024, 1, 1)})
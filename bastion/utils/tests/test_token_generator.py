@@ -0,0 +1,93 @@
+import base64
+import copy
+import json
+import os
+import pickle
+
+import pytest
+
+import generate_token
+from generate_token import TokenGenerator
+
+KEY = 'MySuperSecretKeyForParamsToken12'
+
+
+def envelope_iv(token):
+    envelope = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+    return envelope['iv']
+
+
+@pytest.fixture
+def urandom_calls(monkeypatch):
+    calls = []
+    real_urandom = os.urandom
+
+    def urandom(n):
+        calls.append(n)
+        return real_urandom(n)
+
+    monkeypatch.setattr(generate_token.os, 'urandom', urandom)
+    return calls
+
+
+def test_pool_refills_at_4096_bytes(urandom_calls):
+    generator = TokenGenerator(KEY)
+    ivs = [generator._random_bytes(16) for _ in range(256)]
+    assert urandom_calls == [4096]
+    assert len(set(ivs)) == 256
+
+    assert len(generator._random_bytes(16)) == 16
+    assert urandom_calls == [4096, 4096]
+
+
+def test_pool_never_returns_short_reads(urandom_calls):
+    generator = TokenGenerator(KEY)
+    # 4096 is not a multiple of 12; the 342nd GCM IV needs a refill
+    ivs = [generator._random_bytes(12) for _ in range(342)]
+    assert all(len(iv) == 12 for iv in ivs)
+    assert urandom_calls == [4096, 4096]
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires os.fork')
+def test_forked_child_refills_pool():
+    generator = TokenGenerator(KEY)
+    generator._random_bytes(16)
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        os.write(write_fd, generator._random_bytes(16))
+        os._exit(0)
+
+    os.close(write_fd)
+    with os.fdopen(read_fd, 'rb') as pipe:
+        child_bytes = pipe.read()
+    os.waitpid(pid, 0)
+
+    assert len(child_bytes) == 16
+    assert child_bytes != generator._random_bytes(16)
+
+
+@pytest.mark.parametrize('clone', [copy.copy, copy.deepcopy])
+def test_copies_do_not_share_ivs(clone):
+    generator = TokenGenerator(KEY)
+    generator.encrypt_token({'warm': 'pool'})
+    other = clone(generator)
+
+    config = {'connection': {'type': 'rdp'}}
+    assert envelope_iv(generator.encrypt_token_gcm(config)) != envelope_iv(other.encrypt_token_gcm(config))
+    assert envelope_iv(generator.encrypt_token(config)) != envelope_iv(other.encrypt_token(config))
+
+
+def test_pickle_round_trip():
+    generator = TokenGenerator(KEY)
+    generator.encrypt_token({'warm': 'pool'})
+
+    restored = pickle.loads(pickle.dumps(generator))
+
+    assert type(restored) is TokenGenerator
+    assert restored.secret_key == generator.secret_key
+    assert restored._rand_buf == b''
+    config = {'connection': {'type': 'rdp'}}
+    assert envelope_iv(restored.encrypt_token_gcm(config)) != envelope_iv(generator.encrypt_token_gcm(config))
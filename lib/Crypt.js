@@ -1,5 +1,59 @@
 const Crypto = require('crypto');
 
+const GCM_TAG_LENGTH = 16;
+
+/**
+ * Reads a MessagePack token envelope: a map of string keys to bin or str
+ * values. Only the types the token generators emit are supported.
+ */
+function decodeMsgpackEnvelope(buffer) {
+    let pos = 0;
+
+    const take = (length) => {
+        if (pos + length > buffer.length) {
+            throw new Error('Truncated msgpack envelope');
+        }
+        const chunk = buffer.subarray(pos, pos + length);
+        pos += length;
+        return chunk;
+    };
+    const readLength = (bytes) => take(bytes).readUIntBE(0, bytes);
+
+    const readValue = () => {
+        const type = take(1)[0];
+        if ((type & 0xe0) === 0xa0) {
+            return take(type & 0x1f).toString('utf8');
+        }
+        switch (type) {
+            case 0xd9: return take(readLength(1)).toString('utf8');
+            case 0xda: return take(readLength(2)).toString('utf8');
+            case 0xdb: return take(readLength(4)).toString('utf8');
+            case 0xc4: return take(readLength(1));
+            case 0xc5: return take(readLength(2));
+            case 0xc6: return take(readLength(4));
+        }
+        throw new Error(`Unsupported msgpack type 0x${type.toString(16)} in envelope`);
+    };
+
+    const type = take(1)[0];
+    const size = type === 0xde ? readLength(2) : type & 0x0f;
+
+    const envelope = Object.create(null);
+    for (let i = 0; i < size; i++) {
+        const key = readValue();
+        if (typeof key !== 'string') {
+            throw new Error('msgpack envelope keys must be strings');
+        }
+        envelope[key] = readValue();
+    }
+
+    if (pos !== buffer.length) {
+        throw new Error('Unexpected data after msgpack envelope');
+    }
+
+    return envelope;
+}
+
 class Crypt {
 
     constructor(cypher, key) {
@@ -8,22 +62,34 @@ class Crypt {
     }
 
     decrypt(encodedString) {
-        let encoded = JSON.parse(this.constructor.base64decode(encodedString));
+        const encoded = this.constructor.decodeEnvelope(Buffer.from(encodedString, 'base64'));
+
+        encoded.iv = this.constructor.toBuffer(encoded.iv);
+        encoded.value = this.constructor.toBuffer(encoded.value);
 
-        encoded.iv = this.constructor.base64decode(encoded.iv);
-        encoded.value = this.constructor.base64decode(encoded.value, 'binary');
+        const isGcm = this.constructor.isGcm(this.cypher);
+        const decipher = Crypto.createDecipheriv(this.cypher, this.key, encoded.iv,
+            isGcm ? { authTagLength: GCM_TAG_LENGTH } : undefined);
 
-        const decipher = Crypto.createDecipheriv(this.cypher, this.key, encoded.iv);
+        if (isGcm) {
+            const tag = this.constructor.toBuffer(encoded.tag || '');
+            if (tag.length !== GCM_TAG_LENGTH) {
+                throw new Error(`Authentication tag must be ${GCM_TAG_LENGTH} bytes`);
+            }
+            decipher.setAuthTag(tag);
+        }
 
-        let decrypted = decipher.update(encoded.value, 'binary', 'ascii');
-        decrypted += decipher.final('ascii');
+        let decrypted = decipher.update(encoded.value, undefined, 'utf8');
+        decrypted += decipher.final('utf8');
 
         return JSON.parse(decrypted);
     }
 
     encrypt(jsonData) {
-        const iv = Crypto.randomBytes(16);
-        const cipher = Crypto.createCipheriv(this.cypher, this.key, iv);
+        const isGcm = this.constructor.isGcm(this.cypher);
+        const iv = Crypto.randomBytes(isGcm ? 12 : 16);
+        const cipher = Crypto.createCipheriv(this.cypher, this.key, iv,
+            isGcm ? { authTagLength: GCM_TAG_LENGTH } : undefined);
 
         let encrypted = cipher.update(JSON.stringify(jsonData), 'utf8', 'binary');
         encrypted += cipher.final('binary');
@@ -33,9 +99,34 @@ class Crypt {
             value: this.constructor.base64encode(encrypted, 'binary')
         };
 
+        if (isGcm) {
+            data.tag = this.constructor.base64encode(cipher.getAuthTag());
+        }
+
         return this.constructor.base64encode(JSON.stringify(data));
     }
 
+    /**
+     * Parses the decoded token envelope, which is either a JSON object with
+     * base64 fields or a MessagePack map (fixmap or map16) with raw bytes.
+     */
+    static decodeEnvelope(buffer) {
+        const type = buffer[0];
+        if ((type & 0xf0) === 0x80 || type === 0xde) {
+            return decodeMsgpackEnvelope(buffer);
+        }
+
+        return JSON.parse(buffer.toString('ascii'));
+    }
+
+    static toBuffer(field) {
+        return Buffer.isBuffer(field) ? field : Buffer.from(field, 'base64');
+    }
+
+    static isGcm(cypher) {
+        return cypher.toLowerCase().endsWith('-gcm');
+    }
+
     static base64decode(string, mode) {
         return Buffer.from(string, 'base64').toString(mode || 'ascii');
     }
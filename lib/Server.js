@@ -1,9 +1,9 @@
 const EventEmitter = require('events').EventEmitter;
 const { WebSocketServer } = require('ws');
 const DeepExtend = require('deep-extend');
-const crypto = require('crypto');
 
 const ClientConnection = require('./ClientConnection.js');
+const Crypt = require('./Crypt.js');
 const { LOGLEVEL } = require('./Logger.js');
 const Url = require("url");
 
@@ -384,17 +384,8 @@ class Server extends EventEmitter {
         }
 
         try {
-            const tokenData = JSON.parse(Buffer.from(encryptedToken, 'base64').toString());
-            const decipher = crypto.createDecipheriv(
-                this.clientOptions.crypt.cypher,
-                this.clientOptions.crypt.key,
-                Buffer.from(tokenData.iv, 'base64')
-            );
-
-            let decrypted = decipher.update(Buffer.from(tokenData.value, 'base64'), null, 'utf8');
-            decrypted += decipher.final('utf8');
-
-            return JSON.parse(decrypted);
+            const crypt = new Crypt(this.clientOptions.crypt.cypher, this.clientOptions.crypt.key);
+            return crypt.decrypt(encryptedToken);
         } catch (error) {
             throw new Error('Failed to decrypt token: ' + error.message);
         }
@@ -73,3 +73,120 @@ describe('Encryption/Decryption Tests', () => {
         expect(decryptedToken).toEqual(specialCharObject);
     });
 });
+
+describe('AES-256-GCM Encryption/Decryption Tests', () => {
+    const gcmCypher = 'AES-256-GCM';
+    const gcmCrypt = new Crypt(gcmCypher, key);
+
+    test('Decryption', () => {
+        const encryptedToken = gcmCrypt.encrypt(tokenObject);
+        const decryptedToken = gcmCrypt.decrypt(encryptedToken);
+        expect(decryptedToken).toEqual(tokenObject);
+    });
+
+    test('Token includes authentication tag', () => {
+        const encryptedToken = gcmCrypt.encrypt(tokenObject);
+        const envelope = JSON.parse(Buffer.from(encryptedToken, 'base64').toString());
+        expect(envelope.tag).toBeDefined();
+        expect(Buffer.from(envelope.iv, 'base64').length).toBe(12);
+    });
+
+    test('Decryption with Tampered Value', () => {
+        const encryptedToken = gcmCrypt.encrypt(tokenObject);
+        const envelope = JSON.parse(Buffer.from(encryptedToken, 'base64').toString());
+        const value = Buffer.from(envelope.value, 'base64');
+        value[0] ^= 1;
+        envelope.value = value.toString('base64');
+        const tamperedToken = Buffer.from(JSON.stringify(envelope)).toString('base64');
+        expect(() => {
+            gcmCrypt.decrypt(tamperedToken);
+        }).toThrow();
+    });
+
+    test('Decryption with Truncated Authentication Tag', () => {
+        const encryptedToken = gcmCrypt.encrypt(tokenObject);
+        const envelope = JSON.parse(Buffer.from(encryptedToken, 'base64').toString());
+        envelope.tag = Buffer.from(envelope.tag, 'base64').subarray(0, 4).toString('base64');
+        const truncatedToken = Buffer.from(JSON.stringify(envelope)).toString('base64');
+        expect(() => {
+            gcmCrypt.decrypt(truncatedToken);
+        }).toThrow();
+    });
+
+    test('Decryption without Authentication Tag', () => {
+        const encryptedToken = gcmCrypt.encrypt(tokenObject);
+        const envelope = JSON.parse(Buffer.from(encryptedToken, 'base64').toString());
+        delete envelope.tag;
+        const untaggedToken = Buffer.from(JSON.stringify(envelope)).toString('base64');
+        expect(() => {
+            gcmCrypt.decrypt(untaggedToken);
+        }).toThrow();
+    });
+});
+
+describe('MessagePack Envelope Tests', () => {
+    // Builds the envelope the Python generator emits for format='msgpack':
+    // a fixmap of fixstr keys to bin values
+    const packEnvelope = (fields) => {
+        const parts = [Buffer.from([0x80 | Object.keys(fields).length])];
+        for (const [name, bytes] of Object.entries(fields)) {
+            parts.push(Buffer.from([0xa0 | name.length]), Buffer.from(name));
+            if (bytes.length < 0x100) {
+                parts.push(Buffer.from([0xc4, bytes.length]));
+            } else {
+                const header = Buffer.from([0xc5, 0, 0]);
+                header.writeUInt16BE(bytes.length, 1);
+                parts.push(header);
+            }
+            parts.push(bytes);
+        }
+        return Buffer.concat(parts);
+    };
+
+    const toMsgpackToken = (jsonToken) => {
+        const envelope = JSON.parse(Buffer.from(jsonToken, 'base64').toString());
+        const fields = {};
+        for (const name of Object.keys(envelope)) {
+            fields[name] = Buffer.from(envelope[name], 'base64');
+        }
+        return packEnvelope(fields).toString('base64');
+    };
+
+    test('Decryption', () => {
+        const msgpackToken = toMsgpackToken(crypt.encrypt(tokenObject));
+        expect(crypt.decrypt(msgpackToken)).toEqual(tokenObject);
+    });
+
+    test('Decryption with bin16 value', () => {
+        const largeObject = {connection: {settings: {'private-key': 'k'.repeat(1000)}}};
+        const msgpackToken = toMsgpackToken(crypt.encrypt(largeObject));
+        expect(crypt.decrypt(msgpackToken)).toEqual(largeObject);
+    });
+
+    test('Decryption of URL-safe unpadded token', () => {
+        const msgpackToken = toMsgpackToken(crypt.encrypt(tokenObject))
+            .replace(/\+/g, '-').replace(/\//g, '_').replace(/=+$/, '');
+        expect(crypt.decrypt(msgpackToken)).toEqual(tokenObject);
+    });
+
+    test('Decryption of AES-256-GCM token', () => {
+        const gcmCrypt = new Crypt('AES-256-GCM', key);
+        const msgpackToken = toMsgpackToken(gcmCrypt.encrypt(tokenObject));
+        expect(gcmCrypt.decrypt(msgpackToken)).toEqual(tokenObject);
+    });
+
+    test('Decryption with Truncated Envelope', () => {
+        const envelope = Buffer.from(toMsgpackToken(crypt.encrypt(tokenObject)), 'base64');
+        const truncatedToken = envelope.subarray(0, envelope.length - 1).toString('base64');
+        expect(() => {
+            crypt.decrypt(truncatedToken);
+        }).toThrow();
+    });
+
+    test('Decryption with Unsupported Value Type', () => {
+        const envelope = Buffer.from([0x81, 0xa2, 0x69, 0x76, 0xc0]);
+        expect(() => {
+            crypt.decrypt(envelope.toString('base64'));
+        }).toThrow();
+    });
+});
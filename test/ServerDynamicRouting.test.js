@@ -1,4 +1,5 @@
 const Server = require('../lib/Server');
+const Crypt = require('../lib/Crypt');
 const { LOGLEVEL } = require('../lib/Logger');
 
 // Mock the WebSocketServer to avoid port conflicts
@@ -399,6 +400,40 @@ describe('Server Dynamic Routing and Session Tracking Tests', () => {
         server.decryptToken('not-valid-base64');
       }).toThrow();
     });
+
+    test('should decrypt AES-256-CBC tokens', () => {
+      server = new Server(wsOptions, guacdOptions, clientOptions, callbacks);
+      const tokenData = { connection: { type: 'rdp', settings: { hostname: 'höst.example.com' } } };
+      const token = new Crypt(clientOptions.crypt.cypher, clientOptions.crypt.key).encrypt(tokenData);
+
+      expect(server.decryptToken(token)).toEqual(tokenData);
+    });
+
+    test('should decrypt AES-256-GCM tokens', () => {
+      const gcmClientOptions = { ...clientOptions, crypt: { cypher: 'AES-256-GCM', key: clientOptions.crypt.key } };
+      server = new Server(wsOptions, guacdOptions, gcmClientOptions, callbacks);
+      const tokenData = { connection: { type: 'rdp', settings: { hostname: 'vm.example.com' } } };
+      const token = new Crypt('AES-256-GCM', clientOptions.crypt.key).encrypt(tokenData);
+
+      expect(server.decryptToken(token)).toEqual(tokenData);
+    });
+
+    test('should route AES-256-GCM tokens to the guacd in the token', async () => {
+      const gcmClientOptions = { ...clientOptions, crypt: { cypher: 'AES-256-GCM', key: clientOptions.crypt.key } };
+      server = new Server(wsOptions, guacdOptions, gcmClientOptions, callbacks);
+      const token = new Crypt('AES-256-GCM', clientOptions.crypt.key).encrypt({
+        connection: {
+          type: 'vnc',
+          guacdHost: 'remote-guacd.example.com',
+          guacdPort: 4823,
+          settings: { hostname: 'vm.example.com' }
+        }
+      });
+
+      const result = await server.extractGuacdOptions({ token });
+
+      expect(result.guacdOptions).toEqual({ host: 'remote-guacd.example.com', port: 4823 });
+    });
   });
 
   describe('Backward Compatibility', () => {